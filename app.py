@@ -1,81 +1,308 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+import numpy as np
 import pandas as pd
+import requests
 import yfinance as yf
-from flask import Flask, render_template, request, jsonify
-from collections import defaultdict
+from numba import njit
+from cachetools import TTLCache
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# --- Initialize Flask App ---
-app = Flask(__name__)
+# --- Initialize FastAPI App ---
+app = FastAPI(default_response_class=ORJSONResponse)
+templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
 
 # --- In-Memory Usage & Billing Tracker ---
 usage_tracker = {
     "portfolios_analyzed": 0,
     "advice_generated": 0,
-    "total_bill": 0.0
+    "total_bill": 0.0,
+    "quote_cache_hits": 0,
+    "quote_cache_misses": 0
 }
 COST_PER_PORTFOLIO = 2.00
 COST_PER_ADVICE = 0.25
+# Guards every read-modify-write of usage_tracker so concurrent requests
+# (threaded workers or interleaved coroutines) never lose an update.
+usage_lock = threading.Lock()
+
+def record_usage(num_advice_items: int) -> dict:
+    current_bill = COST_PER_PORTFOLIO + (num_advice_items * COST_PER_ADVICE)
+    with usage_lock:
+        usage_tracker["portfolios_analyzed"] += 1
+        usage_tracker["advice_generated"] += num_advice_items
+        usage_tracker["total_bill"] += current_bill
+        # Snapshot under the lock so the response reflects this request's update.
+        return {"portfolios_analyzed": usage_tracker["portfolios_analyzed"], "total_bill": f'{usage_tracker["total_bill"]:.2f}'}
+
+# --- Market Data Caches ---
+# A ticker's sector effectively never changes.
+OVERVIEW_CACHE_TTL = 86400
+# Quotes are shared between back-to-back requests for the same ticker.
+QUOTE_CACHE_TTL = 30
+
+# --- Blocking I/O Pool ---
+# Dedicated pool for blocking yfinance calls.
+YF_MAX_WORKERS = 16
+yf_executor = ThreadPoolExecutor(max_workers=YF_MAX_WORKERS, thread_name_prefix="yfinance")
+# yf.download collects its results in module globals (shared._DFS, _ERRORS,
+# _TRACEBACKS) that it resets and polls; Ticker.history, which backs fast_info,
+# writes the same globals on its error paths. Every such call holds this lock.
+yf_download_lock = threading.Lock()
+
+# --- Yahoo Rate Limiting ---
+# Yahoo does not publish its limits; ~2,000 requests/hour per IP is the commonly
+# reported ceiling. The bucket holds that full hour, so a cold portfolio (one
+# chart and one info call per ticker) only waits once the process nears it.
+YF_RATE_LIMIT = 2000
+YF_RATE_PERIOD = 3600
+# After Yahoo answers 429, new fetches fail fast for this many seconds.
+YF_THROTTLE_COOLDOWN = 60
+
+class RateLimitError(Exception):
+    pass
+
+class RateLimiter:
+    # Async token bucket: `rate` calls per `per` seconds. Waiters queue on a
+    # FIFO lock, so concurrent requests are served in arrival order.
+    def __init__(self, rate: int, per: float):
+        self.rate, self.per = rate, per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int = 1):
+        tokens = min(tokens, self.rate)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) * self.per / self.rate)
+
+yf_limiter = RateLimiter(YF_RATE_LIMIT, YF_RATE_PERIOD)
 
 # --- 1. Live Data Service (Using yfinance) ---
+# The explicit signature compiles at import and cache=True reuses the
+# machine code across restarts. fastmath is left off so NaN closes keep
+# their IEEE comparison semantics.
+@njit("i8(f8[::1], i8)", cache=True)
+def _rsi_njit(closes, window):
+    gain, loss = 0.0, 0.0
+    n = closes.shape[0]
+    for i in range(n - window, n):
+        delta = closes[i] - closes[i - 1]
+        if delta > 0: gain += delta
+        elif delta < 0: loss -= delta
+    if loss == 0: return 100
+    rsi = 100 - (100 / (1 + gain / loss))
+    if np.isnan(rsi): return 50
+    return int(rsi)
+
 class PathwayClient:
+    def __init__(self):
+        self._overview_cache = TTLCache(maxsize=4096, ttl=OVERVIEW_CACHE_TTL)
+        self._quote_cache = TTLCache(maxsize=10_000, ttl=QUOTE_CACHE_TTL)
+        # Shared by every Yahoo call; the pool is larger than YF_MAX_WORKERS.
+        self.session = requests.Session()
+        # raise_on_status=False hands the final response back once retries run
+        # out, so yfinance and the throttle hook both see the real status code.
+        retries = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+        self.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries))
+        # yfinance swallows most HTTP errors per ticker, so a 429 is recorded here,
+        # where the response status is still visible. It is charged to the fetch
+        # whose worker thread made the call, or to the download holding
+        # yf_download_lock for calls made on yfinance's own download threads.
+        self._throttled_at = float("-inf")
+        self._local = threading.local()
+        self._download_throttle = None
+        self.session.hooks["response"].append(self._note_throttle)
+
+    def _note_throttle(self, response, **kwargs):
+        if response.status_code != 429: return
+        self._throttled_at = time.monotonic()
+        throttle = getattr(self._local, "throttle", None) or self._download_throttle
+        if throttle is not None: throttle.set()
+
+    def _in_cooldown(self) -> bool:
+        return time.monotonic() - self._throttled_at < YF_THROTTLE_COOLDOWN
+
+    def _call_for_fetch(self, throttle: threading.Event, func, *args, **kwargs):
+        self._local.throttle = throttle
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.throttle = None
+
+    async def _run_blocking(self, throttle: threading.Event, func, *args, cost: int = 1, **kwargs):
+        # Every outbound call spends from the Yahoo budget; cache hits never get here.
+        await yf_limiter.acquire(cost)
+        return await asyncio.get_running_loop().run_in_executor(yf_executor, partial(self._call_for_fetch, throttle, func, *args, **kwargs))
+
     @staticmethod
     def _calculate_rsi(data: pd.Series, window: int = 14) -> int:
         if data.empty or len(data) < window + 1: return 50
-        delta = data.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        if loss.iloc[-1] == 0: return 100
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        final_rsi = rsi.iloc[-1]
-        if pd.isna(final_rsi): return 50
-        return int(final_rsi)
-
-    def fetch_live_stock_data(self, tickers: list[str]) -> dict:
-        print(f"\n[Pathway] Connecting to live market feed for: {tickers}...")
+        return _rsi_njit(np.ascontiguousarray(data.to_numpy(dtype=np.float64)), window)
+
+    def _download_history(self, tickers: list[str]) -> pd.DataFrame:
+        with yf_download_lock:
+            self._download_throttle = self._local.throttle
+            try:
+                return yf.download(tickers, period="1y", progress=False, session=self.session)
+            finally:
+                self._download_throttle = None
+
+    def _fetch_overview(self, ticker_str: str) -> dict:
+        # The full info payload is only needed for the sector; everything
+        # else is derived from the shared history download. yfinance returns
+        # an empty info dict when the lookup fails.
+        info = yf.Ticker(ticker_str, session=self.session).info
+        if not info: return {}
+        return {"sector": info.get('sector', 'N/A')}
+
+    async def _get_overview(self, ticker_str: str, throttle: threading.Event) -> dict:
+        # The cache is only touched from the event loop thread, so it needs no lock.
+        overview = self._overview_cache.get(ticker_str)
+        if overview is None:
+            overview = await self._run_blocking(throttle, self._fetch_overview, ticker_str)
+            if not overview: return {"sector": "N/A"}
+            self._overview_cache[ticker_str] = overview
+        return overview
+
+    @staticmethod
+    def _history_column(history: pd.DataFrame, field: str, ticker_str: str, tickers: list[str]) -> pd.Series:
+        # --- THIS IS THE DEFINITIVE FIX ---
+        # This logic now correctly handles the data structure whether 
+        # yfinance returns data for one ticker or many.
+        if len(tickers) == 1:
+            # When one ticker is requested, the DataFrame columns are simple
+            return history[field]
+        # When multiple tickers are requested, the columns are multi-level
+        return history[field][ticker_str]
+
+    def _fetch_batch_quotes(self, history: pd.DataFrame, tickers: list[str]) -> dict:
+        quotes = {}
+        for ticker_str in tickers:
+            closes = self._history_column(history, 'Close', ticker_str, tickers).dropna()
+            if len(closes) < 2: continue
+            volumes = self._history_column(history, 'Volume', ticker_str, tickers).dropna()
+            price, previous_close = float(closes.iloc[-1]), float(closes.iloc[-2])
+            quotes[ticker_str] = {
+                "price": price,
+                "change_percent": ((price - previous_close) / previous_close) * 100,
+                "50d_ma": float(closes.tail(50).mean()),
+                "200d_ma": float(closes.tail(200).mean()),
+                "volume": int(volumes.iloc[-1]) if not volumes.empty else 0,
+                "avg_vol": float(volumes.tail(30).mean()) if not volumes.empty else 0
+            }
+        return quotes
+
+    def _fetch_fast_quote(self, ticker_str: str) -> dict:
+        try:
+            # fast_info is lazy: each key below may run Ticker.history.
+            with yf_download_lock:
+                fast_info = yf.Ticker(ticker_str, session=self.session).fast_info
+                price, previous_close = fast_info['lastPrice'], fast_info['previousClose']
+                return {
+                    "price": price,
+                    "change_percent": ((price - previous_close) / previous_close) * 100,
+                    "50d_ma": fast_info['fiftyDayAverage'],
+                    "200d_ma": fast_info['twoHundredDayAverage'],
+                    "volume": fast_info['lastVolume'],
+                    "avg_vol": fast_info['threeMonthAverageVolume']
+                }
+        except Exception as e:
+            print(f"[Pathway] WARNING: Fast quote lookup failed for {ticker_str}. Error: {e}")
+            return {}
+
+    async def fetch_live_stock_data(self, tickers: list[str]) -> dict:
         live_data = {}
+        # Recently fetched records are served from the quote cache; only the
+        # misses go out to the market feed.
+        for ticker_str in tickers:
+            record = self._quote_cache.get(ticker_str)
+            if record is not None: live_data[ticker_str] = record
+        tickers = [ticker_str for ticker_str in tickers if ticker_str not in live_data]
+        with usage_lock:
+            usage_tracker["quote_cache_hits"] += len(live_data)
+            usage_tracker["quote_cache_misses"] += len(tickers)
+            total_hits, total_misses = usage_tracker["quote_cache_hits"], usage_tracker["quote_cache_misses"]
+        print(f"[Pathway] Quote cache: {len(live_data)} hits, {len(tickers)} misses ({total_hits} hits, {total_misses} misses total).")
+        if not tickers: return live_data
+        if self._in_cooldown():
+            raise RateLimitError("Yahoo throttled a recent request; not fetching during cooldown.")
+
+        # Set when any Yahoo call made for this fetch comes back 429.
+        throttle = threading.Event()
+        print(f"\n[Pathway] Connecting to live market feed for: {tickers}...")
         try:
-            history = yf.download(tickers, period="3mo", progress=False)
-            
-            for ticker_str in tickers:
-                info = yf.Ticker(ticker_str).info
-                if not info or 'currentPrice' not in info or info.get('currentPrice') is None:
+            # The history download and every uncached overview lookup run on the
+            # yfinance pool and are awaited together. Downloads and fast_info
+            # reads take yf_download_lock, because they write yfinance's global
+            # state; the history frame itself is only read here.
+            history, *overviews = await asyncio.gather(
+                self._run_blocking(throttle, self._download_history, tickers, cost=len(tickers)),
+                *(self._get_overview(ticker_str, throttle) for ticker_str in tickers)
+            )
+            quotes = self._fetch_batch_quotes(history, tickers)
+
+            # Fall back to per-ticker fast_info quotes only for tickers the batch has no prices for.
+            missing = [ticker_str for ticker_str in tickers if ticker_str not in quotes]
+            if missing:
+                fast_quotes = await asyncio.gather(*(self._run_blocking(throttle, self._fetch_fast_quote, ticker_str) for ticker_str in missing))
+                for ticker_str, quote in zip(missing, fast_quotes):
+                    if quote: quotes[ticker_str] = quote
+
+            # A throttled call leaves a holding missing or its sector unknown, so
+            # nothing from this fetch is trusted or cached.
+            if throttle.is_set():
+                raise RateLimitError("Yahoo throttled the market data fetch.")
+
+            for ticker_str, overview in zip(tickers, overviews):
+                quote = quotes.get(ticker_str)
+                if not quote:
                     print(f"[Pathway] WARNING: Could not fetch live info for {ticker_str}.")
                     continue
 
-                # --- THIS IS THE DEFINITIVE FIX ---
-                # This logic now correctly handles the data structure whether 
-                # yfinance returns data for one ticker or many.
-                if len(tickers) == 1:
-                    # When one ticker is requested, the DataFrame columns are simple
-                    ticker_history = history['Close']
-                else:
-                    # When multiple tickers are requested, the columns are multi-level
-                    ticker_history = history['Close'][ticker_str]
-                
+                ticker_history = self._history_column(history, 'Close', ticker_str, tickers)
                 if ticker_history.empty:
                     print(f"[Pathway] WARNING: Could not fetch historical data for {ticker_str}.")
                     continue
-                # --- END OF FIX ---
 
                 rsi = self._calculate_rsi(ticker_history)
                 
-                live_data[ticker_str] = {
-                    "price": info.get('currentPrice', 0),
-                    "change_percent": ((info.get('currentPrice', 0) - info.get('previousClose', 1)) / info.get('previousClose', 1)) * 100,
-                    "sector": info.get('sector', 'N/A'),
-                    "50d_ma": info.get('fiftyDayAverage', 0),
-                    "200d_ma": info.get('twoHundredDayAverage', 0),
-                    "rsi": rsi,
-                    "volume": info.get('volume', 0),
-                    "avg_vol": info.get('averageVolume', 0)
-                }
+                live_data[ticker_str] = self._quote_cache[ticker_str] = {**quote, **overview, "rsi": rsi}
             print("[Pathway] Live data received successfully.")
             return live_data
+        except RateLimitError:
+            print("[Pathway] ERROR: Rate limited by the market data provider.")
+            raise
         except Exception as e:
+            if throttle.is_set():
+                print("[Pathway] ERROR: Rate limited by the market data provider.")
+                raise RateLimitError("Yahoo throttled the market data fetch.") from e
             print(f"[Pathway] ERROR: Failed to fetch live data. Error: {e}")
             return {}
 
 # --- The rest of the app.py file is unchanged... ---
+# Indexed by (pnl > 2) - (pnl < -2) + 1: loss, flat, profit.
+STATUS_ICONS = ("🔴", "🔵", "🟢")
+NEUTRAL_REASON = "the current indicators are neutral."
+BUY_MORE_ADVICE = ("Consider buying more (Averaging)", "The stock shows positive short-term signals while being in a healthy long-term uptrend and not overbought.")
+
 class AnalysisEngine:
     def generate_advice(self, portfolio: list[dict], live_data: dict, risk_profile: str) -> list[str]:
         advice_list = []
@@ -84,38 +311,43 @@ class AnalysisEngine:
             if ticker not in live_data: continue
             
             data = live_data[ticker]
-            pnl_percent = ((data["price"] - stock["avg_price"]) / stock["avg_price"]) * 100
+            price, avg_price = data["price"], stock["avg_price"]
+            ma50, rsi = data.get("50d_ma", 0), data.get("rsi", 100)
+            change_percent = data.get("change_percent", 0)
+            volume, avg_vol = data.get("volume", 0), data.get("avg_vol", 0)
+            pnl_percent = ((price - avg_price) / avg_price) * 100
             score = 0
             reasons = []
 
-            if data.get("price", 0) < data.get("50d_ma", 0):
+            if price < ma50:
                 score -= 2
                 reasons.append("it's trading below its 50-Day trendline")
-            if data.get("rsi", 100) > 70:
+            if rsi > 70:
                 score -= 1
                 reasons.append("it's in the overbought zone (RSI > 70)")
-            elif data.get("rsi", 0) < 30:
+            elif rsi < 30:
                 score += 1
                 reasons.append("it's in the oversold zone (RSI < 30)")
-            if data.get("change_percent", 0) < -2.0 and data.get("volume", 0) > data.get("avg_vol", 0) * 1.5:
+            if change_percent < -2.0 and volume > avg_vol * 1.5:
                 score -= 2
                 reasons.append("it's falling on high volume")
-            elif data.get("change_percent", 0) < -2.0:
+            elif change_percent < -2.0:
                 score -= 1
                 reasons.append("it's facing selling pressure today")
 
             advice, final_reason = self._get_final_advice(score, pnl_percent, risk_profile, reasons, data)
             
-            status_icon = "🟢" if pnl_percent > 2 else "🔴" if pnl_percent < -2 else "🔵"
-            advice_text = f"{status_icon} **{ticker}**\n"
-            advice_text += f"   - Your P/L: {pnl_percent:.2f}%\n"
-            advice_text += f"   - **ADVICE: {advice}**\n"
-            advice_text += f"   - **Reason:** {final_reason}"
-            advice_list.append(advice_text)
+            status_icon = STATUS_ICONS[(pnl_percent > 2) - (pnl_percent < -2) + 1]
+            advice_list.append("\n".join((
+                f"{status_icon} **{ticker}**",
+                f"   - Your P/L: {pnl_percent:.2f}%",
+                f"   - **ADVICE: {advice}**",
+                f"   - **Reason:** {final_reason}"
+            )))
         return advice_list
 
     def _get_final_advice(self, score: int, pnl: float, risk: str, reasons: list[str], live_stock_data: dict) -> tuple[str, str]:
-        reason_str = ", and ".join(reasons) if reasons else "the current indicators are neutral."
+        reason_str = ", and ".join(reasons) if reasons else NEUTRAL_REASON
 
         if risk == "Conservative": score -= 1
         if risk == "Aggressive": score += 1
@@ -124,7 +356,7 @@ class AnalysisEngine:
         is_not_overbought = live_stock_data.get('rsi', 100) < 65
 
         if score >= 1 and is_healthy_long_term and is_not_overbought and pnl < 15:
-            return "Consider buying more (Averaging)", "The stock shows positive short-term signals while being in a healthy long-term uptrend and not overbought."
+            return BUY_MORE_ADVICE
 
         if score <= -3:
             return "Strongly consider selling", reason_str
@@ -138,14 +370,15 @@ class AnalysisEngine:
             return "Hold and Monitor", reason_str
 
     def analyse_diversification(self, portfolio: list[dict], live_data: dict) -> str:
-        sector_values = defaultdict(float)
+        sector_values = {}
         total_value = 0
         for stock in portfolio:
             ticker = stock['ticker']
             if ticker in live_data:
-                current_value = stock['quantity'] * live_data[ticker]['price']
-                sector = live_data[ticker]['sector']
-                sector_values[sector] += current_value
+                live_info = live_data[ticker]
+                current_value = stock['quantity'] * live_info['price']
+                sector = live_info['sector']
+                sector_values[sector] = sector_values.get(sector, 0.0) + current_value
                 total_value += current_value
         if total_value == 0: return "Could not calculate diversification due to missing data."
         highly_concentrated_sectors = []
@@ -158,54 +391,75 @@ class AnalysisEngine:
         else:
             return "✅ **Good Diversification:** Your portfolio appears to be well-diversified."
 
+class StockHolding(BaseModel):
+    ticker: str
+    quantity: float
+    averagePrice: float
+
+class PortfolioRequest(BaseModel):
+    portfolio: list[StockHolding] | None = None
+
+@app.exception_handler(RequestValidationError)
+async def invalid_request(request: Request, exc: RequestValidationError):
+    print(f"Rejected invalid request body: {exc.errors()}")
+    return ORJSONResponse({"error": "Invalid portfolio data. Check each ticker, quantity and average price."}, status_code=400)
+
 pathway = PathwayClient()
 engine = AnalysisEngine()
 
-@app.route('/')
+# index.html takes no template context.
+INDEX_HTML = templates.get_template('index.html').render()
+
+@app.get('/', response_class=HTMLResponse)
 def index():
-    return render_template('index.html')
+    return HTMLResponse(INDEX_HTML, headers={"Cache-Control": "public, max-age=3600"})
 
-@app.route('/analyse', methods=['POST'])
-def analyse_portfolio():
+@app.post('/analyse')
+async def analyse_portfolio(payload: PortfolioRequest):
     try:
-        data = request.get_json()
-        portfolio_data = data.get('portfolio')
+        portfolio_data = [stock.model_dump() for stock in payload.portfolio or []]
         if not portfolio_data:
-            return jsonify({"error": "Portfolio data is missing."}), 400
+            return ORJSONResponse({"error": "Portfolio data is missing."}, status_code=400)
 
-        num_advice_items = len(portfolio_data)
-        current_bill = COST_PER_PORTFOLIO + (num_advice_items * COST_PER_ADVICE)
-        usage_tracker["portfolios_analyzed"] += 1
-        usage_tracker["advice_generated"] += num_advice_items
-        usage_tracker["total_bill"] += current_bill
+        usage_stats = record_usage(len(portfolio_data))
         
         tickers_to_fetch = [stock['ticker'] for stock in portfolio_data]
-        live_market_data = pathway.fetch_live_stock_data(tickers_to_fetch)
+        live_market_data = await pathway.fetch_live_stock_data(tickers_to_fetch)
         if not live_market_data:
-            return jsonify({"error": "Could not fetch live market data. Check ticker symbols or try again later."}), 500
+            return ORJSONResponse({"error": "Could not fetch live market data. Check ticker symbols or try again later."}, status_code=500)
 
-        table_results, analysis_portfolio = [], []
-        for stock in portfolio_data:
-            ticker = stock['ticker']
-            if ticker in live_market_data:
-                live_info = live_market_data[ticker]
-                investment = stock['quantity'] * stock['averagePrice']
-                currentValue = stock['quantity'] * live_info['price']
-                table_results.append({**stock, "investment": investment, "currentPrice": live_info['price'], "currentValue": currentValue, "pnl": currentValue - investment, "change_percent": live_info['change_percent']})
-                analysis_portfolio.append({"ticker": ticker, "quantity": stock['quantity'], "avg_price": stock['averagePrice']})
+        # P/L for every matched holding is computed in one vectorized pass over
+        # aligned quantity / average-price / live-price arrays.
+        matched = [stock for stock in portfolio_data if stock['ticker'] in live_market_data]
+        quantities = np.fromiter((stock['quantity'] for stock in matched), np.float64, len(matched))
+        avg_prices = np.fromiter((stock['averagePrice'] for stock in matched), np.float64, len(matched))
+        prices = np.fromiter((live_market_data[stock['ticker']]['price'] for stock in matched), np.float64, len(matched))
+        investments = quantities * avg_prices
+        current_values = quantities * prices
+        pnls = current_values - investments
+
+        table_results = [
+            {**stock, "investment": investment, "currentPrice": currentPrice, "currentValue": currentValue, "pnl": pnl, "change_percent": live_market_data[stock['ticker']]['change_percent']}
+            for stock, investment, currentPrice, currentValue, pnl in zip(matched, investments.tolist(), prices.tolist(), current_values.tolist(), pnls.tolist())
+        ]
+        analysis_portfolio = [{"ticker": stock['ticker'], "quantity": stock['quantity'], "avg_price": stock['averagePrice']} for stock in matched]
 
         generated_advice = engine.generate_advice(analysis_portfolio, live_market_data, "Moderate")
         diversification_advice = engine.analyse_diversification(analysis_portfolio, live_market_data)
         
-        return jsonify({
+        # Returning the response directly skips FastAPI's jsonable_encoder pass.
+        return ORJSONResponse({
             "table_data": table_results,
             "advice": generated_advice,
             "diversification_advice": diversification_advice,
-            "usage_stats": {"portfolios_analyzed": usage_tracker["portfolios_analyzed"], "total_bill": f'{usage_tracker["total_bill"]:.2f}'}
+            "usage_stats": usage_stats
         })
+    except RateLimitError:
+        return ORJSONResponse({"error": "The market data provider is rate limiting requests. Please try again in a minute."}, status_code=429)
     except Exception as e:
         print(f"An error occurred during analysis: {e}")
-        return jsonify({"error": "An internal server error occurred."}), 500
+        return ORJSONResponse({"error": "An internal server error occurred."}, status_code=500)
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
+    import uvicorn
+    uvicorn.run("app:app", host='0.0.0.0', port=5000, reload=True)
\ No newline at end of file